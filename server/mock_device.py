@@ -8,8 +8,13 @@ Implements the full protocol including acknowledgment waiting and retries.
 Features:
 - Sends sample log entries with boot_seq, seq, system stats
 - Sends heartbeats every 1 second of idle time
-- Waits for acknowledgments ({"ack":1})
-- Retries on timeout or missing ack
+- Pipelines sends: up to ACK_WINDOW entries may be awaiting an ack
+- Matches acknowledgments ({"ack":1}) on a background reader thread
+- Drops the oldest unacked entry on ack timeout; nothing is retransmitted on
+  a live connection, so a line the server rejects is not retried
+- Reuses one pooled connection, reconnecting when it breaks or stops getting
+  acks (paced by the send retry backoff) and replaying the unacked entries on
+  the new connection
 - Simulates both synced (with ts) and unsynced (ts:null) scenarios
 """
 
@@ -18,105 +23,485 @@ import json
 import time
 import argparse
 import sys
-from datetime import datetime, timezone
-from typing import Optional
+import threading
+import random
+from collections import deque
+from typing import Any, Callable, Optional, Sequence
+
+try:
+    import orjson  # Optional: faster JSON encoding, falls back to stdlib json
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np  # Optional: batch generation of mock stats noise
+except ImportError:
+    np = None
+
+
+# Protocol configuration
+ACK_WINDOW = 16          # Max entries in flight awaiting an ack
+ACK_TIMEOUT = 2.0        # Seconds before the oldest unacked entry is dropped
+MAX_ACK_TIMEOUTS = 3     # Consecutive ack timeouts before the connection is replaced
+RETRY_BASE_DELAY = 0.1   # First send retry backoff, doubled per attempt...
+RETRY_MAX_DELAY = 5.0    # ...up to this cap
+RETRY_JITTER = 0.1       # Plus up to this much random delay
+READ_POLL_INTERVAL = 0.2  # Reader thread recv timeout (bounds ack timeout checks)
+TIMESTAMP_RESOLUTION = 0.001  # "ts" strings are reused for up to 1ms
+SOCKET_BUFFER_BYTES = 256 * 1024  # SO_SNDBUF/SO_RCVBUF for the server connection
+STATS_BATCH_SIZE = 10000  # Rows of stats noise generated per NumPy call
+ACK_BODY = b'{"ack":1}'  # The server's ack line, byte for byte, minus the newline
+
+# Connection pool configuration
+DEFAULT_IDLE_TIMEOUT_MS = 30000  # Close the connection after this long unused
+
+# Pre-encoded JSON lines for the entries the device sends; only the values
+# change between entries, so the keys are never re-serialized
+LOG_TEMPLATE = b'{"boot_seq":%d,"uptime_ms":%d,"seq":%d,"level":%b,"msg":%b,"system":%b,"ts":%b}\n'
+HEARTBEAT_TEMPLATE = b'{"boot_seq":%d,"uptime_ms":%d,"type":"heartbeat","system":%b,"ts":%b}\n'
+
+
+if orjson is not None:
+    json_dumps_bytes = orjson.dumps  # Compact output, returns bytes
+else:
+    # Reused compact encoder; json.dumps builds a fresh one per call here
+    json_encode = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+
+    def json_dumps_bytes(obj: Any) -> bytes:
+        return json_encode(obj).encode('utf-8')
+
+
+class ConnectionPool:
+    """
+    Holds the single persistent connection to the server
+
+    get() hands out the connection, opening it if needed, and release()
+    returns it. A broken connection is only marked unhealthy by whoever sees
+    the failure (a failed send, EOF, or the server no longer acking) and is
+    replaced on the next get(). The pool has no backoff of its own: every
+    get() without a connection tries to connect, and callers space out their
+    retries (see MockDevice.send_payload). A janitor thread calls cleanup()
+    to close the connection once it has been unused for idle_timeout_ms.
+    """
+
+    def __init__(self, host: str, port: int, on_connect: Callable[[socket.socket], None],
+                 idle_timeout_ms: int = DEFAULT_IDLE_TIMEOUT_MS):
+        self.host = host
+        self.port = port
+        self.on_connect = on_connect  # Runs on each new connection before get() returns it
+        self.idle_timeout_ms = idle_timeout_ms
+        self.sock: Optional[socket.socket] = None
+        self.healthy = False
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._last_used = 0.0
+        self._ready = threading.Event()  # Cleared while on_connect runs for a new connection
+        self._ready.set()
+        self._stop = threading.Event()
+        self._janitor: Optional[threading.Thread] = None
+
+    def get(self) -> Optional[socket.socket]:
+        """Return the pooled connection, or None if it cannot be (re)opened yet"""
+        with self._lock:
+            if self.sock is not None and not self.healthy:
+                self._close()
+            opened = self.sock is None
+            if opened:
+                if not self._open():
+                    return None
+                self._ready.clear()
+
+            self._in_use += 1
+            self._last_used = time.monotonic()
+            sock = self.sock
+
+        # on_connect may block on I/O (replaying entries), so it runs without
+        # the lock; other callers wait for it before using the connection
+        if not opened:
+            self._ready.wait()
+            return sock
+        try:
+            self.on_connect(sock)
+        except Exception as e:
+            print(f"[DEVICE] Connection setup failed: {e}", file=sys.stderr)
+            self.mark_unhealthy(sock)
+            self.release(sock)
+            return None
+        finally:
+            self._ready.set()
+        return sock
+
+    def release(self, sock: socket.socket):
+        """Hand a connection from get() back to the pool"""
+        with self._lock:
+            if sock is self.sock:
+                self._in_use -= 1
+                self._last_used = time.monotonic()
+
+    def mark_unhealthy(self, sock: socket.socket):
+        """Flag a connection as broken; the next get() replaces it"""
+        with self._lock:
+            if sock is self.sock:
+                self.healthy = False
+
+    def cleanup(self):
+        """Close the connection if nothing has used it for idle_timeout_ms"""
+        with self._lock:
+            if self.sock is None or self._in_use:
+                return
+            if (time.monotonic() - self._last_used) * 1000 < self.idle_timeout_ms:
+                return
+            print(f"[DEVICE] Closing connection idle for over {self.idle_timeout_ms}ms", file=sys.stderr)
+            self._close()
+
+    def close(self):
+        """Close the connection and stop the janitor"""
+        self._stop.set()
+        if self._janitor and self._janitor is not threading.current_thread():
+            self._janitor.join(timeout=1.0)
+        self._janitor = None
+        with self._lock:
+            self._close()
+
+    def _open(self) -> bool:
+        """Connect (caller holds the lock)"""
+        sock = None
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # Entries are small JSON lines: send each one immediately (no Nagle)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_BYTES)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_BYTES)
+            sock.settimeout(5.0)
+            sock.connect((self.host, self.port))
+            sock.settimeout(READ_POLL_INTERVAL)
+            self.sock = sock
+            self.healthy = True
+            print(f"[DEVICE] Connected to {self.host}:{self.port}", file=sys.stderr)
+        except Exception as e:
+            print(f"[DEVICE] Connection failed: {e}", file=sys.stderr)
+            if sock is not None:
+                sock.close()
+            self.sock = None
+            self.healthy = False
+            return False
+
+        if self._janitor is None or not self._janitor.is_alive():
+            self._stop.clear()
+            self._janitor = threading.Thread(target=self._run_janitor, daemon=True)
+            self._janitor.start()
+        return True
+
+    def _close(self):
+        """Close the connection (caller holds the lock)"""
+        if self.sock is None:
+            return
+        try:
+            self.sock.close()
+        except:
+            pass
+        self.sock = None
+        self.healthy = False
+        self._in_use = 0
+        print("[DEVICE] Disconnected", file=sys.stderr)
+
+    def _run_janitor(self):
+        """Janitor thread: periodically close the connection once idle"""
+        while not self._stop.wait(self.idle_timeout_ms / 2000):
+            self.cleanup()
 
 
 class MockDevice:
     """Mock ESP32 device that sends logs and heartbeats"""
 
-    def __init__(self, host: str, port: int, boot_seq: int = 1):
+    def __init__(self, host: str, port: int, boot_seq: int = 1,
+                 idle_timeout_ms: int = DEFAULT_IDLE_TIMEOUT_MS):
         self.host = host
         self.port = port
         self.boot_seq = boot_seq
         self.seq = 0
         self.uptime_ms = 0
         self.start_time = time.time()
-        self.socket: Optional[socket.socket] = None
-        self.connected = False
+        self.pool = ConnectionPool(host, port, self._on_connect, idle_timeout_ms)
         self.has_ntp_sync = False  # Simulate no NTP sync initially
-
-    def connect(self) -> bool:
-        """Connect to server"""
-        try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.settimeout(5.0)
-            self.socket.connect((self.host, self.port))
-            self.connected = True
-            print(f"[DEVICE] Connected to {self.host}:{self.port}", file=sys.stderr)
-            return True
-        except Exception as e:
-            print(f"[DEVICE] Connection failed: {e}", file=sys.stderr)
-            self.connected = False
-            return False
+        self.timestamp_cache = (0.0, "")  # (time.time(), formatted ts)
+        self._rng = np.random.default_rng() if np is not None else None
+        self._stats_batch: list = []  # Pre-generated rows, consumed by get_system_stats
+
+        # Pipelined ack tracking. The server acks entries in the order it
+        # receives them and acks carry no sequence number, so each ack is
+        # matched against the oldest entry still in flight.
+        self._unacked: deque = deque()  # [buffers, sent_at]
+        self._ack_timeouts = 0  # Consecutive ack timeouts on the current connection
+        self._state_lock = threading.Lock()
+        self._all_acked = threading.Condition(self._state_lock)
+        self._send_lock = threading.Lock()  # Serializes sends across threads
+        self._window = threading.BoundedSemaphore(ACK_WINDOW)  # Over-release raises
+        self._reader: Optional[threading.Thread] = None
+
+    def _on_connect(self, sock: socket.socket):
+        """Start the ack reader for a new pooled connection"""
+        self._reader = threading.Thread(target=self._read_acks, args=(sock,), daemon=True)
+        self._reader.start()
+
+        # Entries still in flight on a previous connection are replayed
+        with self._state_lock:
+            self._ack_timeouts = 0
+            pending = list(self._unacked)
+            for entry in pending:
+                entry[1] = time.monotonic()
+        for entry in pending:
+            self._send(sock, *entry[0])
+        if pending:
+            print(f"[DEVICE] Replayed {len(pending)} unacked entries", file=sys.stderr)
 
     def disconnect(self):
         """Disconnect from server"""
-        if self.socket:
+        self.pool.close()
+        if self._reader and self._reader is not threading.current_thread():
+            self._reader.join(timeout=1.0)
+        self._reader = None
+
+    def _send(self, sock: socket.socket, *buffers: bytes):
+        """
+        Write buffers to the socket back to back (safe to call from any thread)
+        Uses scatter-gather sendmsg so a line and its newline need not be
+        concatenated first; platforms without sendmsg (Windows) join them
+        """
+        with self._send_lock:
+            if not hasattr(sock, 'sendmsg'):
+                sock.sendall(b''.join(buffers))
+                return
+
+            pending = list(buffers)
+            while pending:
+                sent = sock.sendmsg(pending)
+                # Drop fully sent buffers, trim a partially sent one
+                while pending and sent >= len(pending[0]):
+                    sent -= len(pending[0])
+                    pending.pop(0)
+                if sent:
+                    pending[0] = memoryview(pending[0])[sent:]
+
+    def _read_acks(self, sock: socket.socket):
+        """Reader thread: match acks to in-flight entries, drop them on timeout"""
+        buffer = b""
+        while self.pool.sock is sock:
             try:
-                self.socket.close()
-            except:
-                pass
-            self.socket = None
-            self.connected = False
-            print("[DEVICE] Disconnected", file=sys.stderr)
+                data = sock.recv(1024)
+            except socket.timeout:
+                if self._drop_expired():
+                    break
+                continue
+            except OSError:
+                break
+
+            if not data:
+                print("[DEVICE] Server closed connection", file=sys.stderr)
+                break
+
+            lines = (buffer + data).split(b'\n')
+            buffer = lines.pop()
+            for line in lines:
+                line = line.strip()
+                if line:
+                    self._handle_ack(line)
+            if self._drop_expired():
+                break
+
+        # Let the next send reconnect and replay whatever is still unacked
+        # (also reached when the server stops acking altogether)
+        self.pool.mark_unhealthy(sock)
+
+    def _handle_ack(self, line: bytes):
+        """Match one ack line against the oldest in-flight entry"""
+        # The server's ack is a constant, so compare bytes and only fall back
+        # to parsing JSON for anything formatted differently
+        if line != ACK_BODY:
+            try:
+                ack = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                print(f"[DEVICE] Invalid ack JSON: {line}", file=sys.stderr)
+                return
+
+            if not isinstance(ack, dict) or ack.get('ack') != 1:
+                print(f"[DEVICE] Invalid ack: {ack}", file=sys.stderr)
+                return
+
+        with self._state_lock:
+            if not self._unacked:
+                print("[DEVICE] Unexpected ack (nothing in flight)", file=sys.stderr)
+                return
+            self._unacked.popleft()
+            self._ack_timeouts = 0
+            self._all_acked.notify_all()
+        self._window.release()
+        print("[DEVICE] Ack received", file=sys.stderr)
+
+    def _drop_expired(self) -> bool:
+        """
+        Give up on the oldest in-flight entry if its ack is overdue
+        Returns True once MAX_ACK_TIMEOUTS acks in a row have timed out, i.e.
+        the server has stopped acking and the connection should be replaced
+        """
+        # Acks carry no sequence number, so resending on the same connection
+        # could log an entry twice (e.g. after the server rejects an earlier
+        # line and the acks shift by one). Unacked entries are only replayed
+        # on a new connection, in _on_connect.
+        with self._state_lock:
+            if not self._unacked or time.monotonic() - self._unacked[0][1] < ACK_TIMEOUT:
+                return False
+            self._unacked.popleft()
+            self._ack_timeouts += 1
+            timeouts = self._ack_timeouts
+            self._all_acked.notify_all()
+
+        self._window.release()
+        print("[DEVICE] Ack timeout, dropping oldest unacked entry", file=sys.stderr)
+        if timeouts < MAX_ACK_TIMEOUTS:
+            return False
+        print(f"[DEVICE] {timeouts} ack timeouts in a row, replacing connection", file=sys.stderr)
+        return True
+
+    def wait_for_acks(self, timeout: float = 2 * ACK_TIMEOUT) -> bool:
+        """
+        Block until every in-flight entry has been acked or dropped
+        Returns True if nothing is left in flight, False on timeout
+        """
+        deadline = time.monotonic() + timeout
+        with self._all_acked:
+            while self._unacked:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._all_acked.wait(remaining)
+        return True
 
     def send_entry(self, entry: dict, retry_count: int = 3) -> bool:
         """
-        Send an entry and wait for ack
-        Returns True if ack received, False otherwise
+        Send an entry without waiting for its ack
+        Returns True if the entry was sent, False otherwise
         """
-        if not self.connected:
-            if not self.connect():
-                return False
+        return self.send_payload(json_dumps_bytes(entry), b'\n', retry_count=retry_count)
+
+    def send_payload(self, *buffers: bytes, retry_count: int = 3) -> bool:
+        """
+        Send one encoded JSON line, given as one or more buffers that are
+        sent back to back, without waiting for its ack
+        Blocks only while ACK_WINDOW entries are already in flight; acks are
+        matched by the reader thread. Failed sends are retried up to
+        retry_count times with exponential backoff plus jitter. Returns True
+        if the line was sent, False otherwise
+        """
+        if not self._window.acquire(timeout=2 * ACK_TIMEOUT):
+            print("[DEVICE] Ack window stalled, dropping entry", file=sys.stderr)
+            return False
+
+        for attempt in range(retry_count + 1):
+            if attempt:
+                delay = min(RETRY_BASE_DELAY * 2 ** (attempt - 1), RETRY_MAX_DELAY) + random.random() * RETRY_JITTER
+                print(f"[DEVICE] Retrying in {delay:.2f}s... ({retry_count - attempt + 1} attempts left)", file=sys.stderr)
+                time.sleep(delay)
+
+            sent = self._attempt_send(buffers)
+            if sent:
+                return True
+            if sent is None:
+                return False  # Its window slot was already released
+
+        # Never sent, so it holds no place in the ack window
+        self._window.release()
+        return False
+
+    def _attempt_send(self, buffers: tuple) -> Optional[bool]:
+        """
+        Single send attempt on the pooled connection
+        On success the line is tracked as in flight until acked. Returns True
+        if sent, False if the send failed and may be retried, or None if it
+        failed after a stray ack or timeout had already taken the entry off
+        the in-flight queue and released its window slot
+        """
+        sock = self.pool.get()
+        if sock is None:
+            return False
+
+        in_flight = [buffers, time.monotonic()]
+        with self._state_lock:
+            self._unacked.append(in_flight)
 
         # Send entry
         try:
-            json_line = json.dumps(entry) + '\n'
-            self.socket.sendall(json_line.encode('utf-8'))
-            print(f"[DEVICE] Sent: {json.dumps(entry)[:100]}...", file=sys.stderr)
-
-            # Wait for ack
-            self.socket.settimeout(2.0)
-            response = self.socket.recv(1024)
-            if response:
-                try:
-                    ack = json.loads(response.decode('utf-8').strip())
-                    if ack.get('ack') == 1:
-                        print("[DEVICE] Ack received", file=sys.stderr)
-                        return True
-                    else:
-                        print(f"[DEVICE] Invalid ack: {ack}", file=sys.stderr)
-                except json.JSONDecodeError:
-                    print(f"[DEVICE] Invalid ack JSON: {response}", file=sys.stderr)
-
-        except socket.timeout:
-            print("[DEVICE] Ack timeout", file=sys.stderr)
+            self._send(sock, *buffers)
+            print(f"[DEVICE] Sent: {buffers[0][:100].decode('utf-8', errors='replace')}...", file=sys.stderr)
+            return True
         except Exception as e:
+            # A partial line may be on the wire, so the connection is not reused
             print(f"[DEVICE] Send error: {e}", file=sys.stderr)
-            self.disconnect()
-
-        # Retry logic
-        if retry_count > 0:
-            print(f"[DEVICE] Retrying... ({retry_count} attempts left)", file=sys.stderr)
-            time.sleep(1)
-            return self.send_entry(entry, retry_count - 1)
-
-        return False
+            with self._state_lock:
+                try:
+                    self._unacked.remove(in_flight)
+                    still_tracked = True
+                except ValueError:
+                    still_tracked = False
+            self.pool.mark_unhealthy(sock)
+            return False if still_tracked else None
+        finally:
+            self.pool.release(sock)
 
     def get_system_stats(self) -> dict:
         """Generate mock system stats"""
-        import random
+        heap_free, heap_used, spiffs_free, spiffs_used = self._next_stats_noise()
         return {
-            "heap_free": 200000 + random.randint(-10000, 10000),
-            "heap_used": 50000 + random.randint(-5000, 5000),
+            "heap_free": heap_free,
+            "heap_used": heap_used,
             "uptime_ms": self.uptime_ms,
             "free_psram": 4194304,
             "task_count": 3,
-            "spiffs_free": 900000 + random.randint(-50000, 50000),
-            "spiffs_used": 100000 + random.randint(-10000, 10000)
+            "spiffs_free": spiffs_free,
+            "spiffs_used": spiffs_used
         }
 
+    def _next_stats_noise(self) -> Sequence[int]:
+        """
+        Next (heap_free, heap_used, spiffs_free, spiffs_used) sample
+        With NumPy, rows come from a batch of STATS_BATCH_SIZE generated in a
+        single call. Otherwise all four come from one 64-bit draw: each takes
+        its own bit slice, scaled onto its range with a multiply-shift
+        """
+        if self._rng is not None:
+            if not self._stats_batch:
+                self._stats_batch = self._rng.integers(
+                    [190000, 45000, 850000, 90000],
+                    [210000, 55000, 950000, 110000],
+                    size=(STATS_BATCH_SIZE, 4),
+                    endpoint=True
+                ).tolist()
+            return self._stats_batch.pop()
+
+        bits = random.getrandbits(64)
+        return (
+            190000 + (((bits & 0x7FFF) * 20001) >> 15),              # 200000 +/- 10000
+            45000 + ((((bits >> 15) & 0x3FFF) * 10001) >> 14),       # 50000 +/- 5000
+            850000 + ((((bits >> 29) & 0x1FFFF) * 100001) >> 17),    # 900000 +/- 50000
+            90000 + ((((bits >> 46) & 0x7FFF) * 20001) >> 15)        # 100000 +/- 10000
+        )
+
+    def utc_timestamp(self) -> str:
+        """
+        Current UTC time as ISO 8601 for the "ts" field, always with
+        microseconds (YYYY-MM-DDTHH:MM:SS.ffffff+00:00), cached per
+        TIMESTAMP_RESOLUTION
+        """
+        now = time.time()
+        cached_at, cached = self.timestamp_cache
+        if 0.0 <= now - cached_at < TIMESTAMP_RESOLUTION:
+            return cached
+
+        micros = int((now % 1) * 1_000_000)
+        formatted = f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(now))}.{micros:06d}+00:00"
+        self.timestamp_cache = (now, formatted)
+        return formatted
+
     def update_uptime(self):
         """Update simulated uptime"""
         elapsed = time.time() - self.start_time
@@ -126,22 +511,20 @@ class MockDevice:
         """Send a log entry"""
         self.update_uptime()
 
-        entry = {
-            "boot_seq": self.boot_seq,
-            "uptime_ms": self.uptime_ms,
-            "seq": self.seq,
-            "level": level,
-            "msg": msg,
-            "system": self.get_system_stats()
-        }
-
         # Add timestamp if NTP synced
-        if self.has_ntp_sync:
-            entry["ts"] = datetime.now(timezone.utc).isoformat()
-        else:
-            entry["ts"] = None
-
-        success = self.send_entry(entry)
+        ts = json_dumps_bytes(self.utc_timestamp()) if self.has_ntp_sync else b'null'
+
+        payload = LOG_TEMPLATE % (
+            self.boot_seq,
+            self.uptime_ms,
+            self.seq,
+            json_dumps_bytes(level),
+            json_dumps_bytes(msg),
+            json_dumps_bytes(self.get_system_stats()),
+            ts
+        )
+
+        success = self.send_payload(payload)
         if success:
             self.seq += 1
 
@@ -151,20 +534,17 @@ class MockDevice:
         """Send a heartbeat"""
         self.update_uptime()
 
-        heartbeat = {
-            "boot_seq": self.boot_seq,
-            "uptime_ms": self.uptime_ms,
-            "type": "heartbeat",
-            "system": self.get_system_stats()
-        }
-
         # Add timestamp if NTP synced
-        if self.has_ntp_sync:
-            heartbeat["ts"] = datetime.now(timezone.utc).isoformat()
-        else:
-            heartbeat["ts"] = None
+        ts = json_dumps_bytes(self.utc_timestamp()) if self.has_ntp_sync else b'null'
 
-        return self.send_entry(heartbeat)
+        payload = HEARTBEAT_TEMPLATE % (
+            self.boot_seq,
+            self.uptime_ms,
+            json_dumps_bytes(self.get_system_stats()),
+            ts
+        )
+
+        return self.send_payload(payload)
 
     def run_test_sequence(self):
         """Run a test sequence of logs and heartbeats"""
@@ -173,28 +553,20 @@ class MockDevice:
         # Send some initial logs (no NTP sync)
         print("\n=== Phase 1: Logs without NTP sync (ts:null) ===", file=sys.stderr)
         self.send_log("info", "Device booting...")
-        time.sleep(0.5)
         self.send_log("info", "WiFi connecting...")
-        time.sleep(0.5)
         self.send_log("info", "WiFi connected to WAP")
-        time.sleep(0.5)
 
         # Simulate NTP sync
         print("\n=== Phase 2: NTP sync acquired ===", file=sys.stderr)
         self.has_ntp_sync = True
         self.send_log("info", "NTP sync successful")
-        time.sleep(0.5)
 
         # Send logs with timestamps
         print("\n=== Phase 3: Logs with timestamps ===", file=sys.stderr)
         self.send_log("info", "Logger initialized")
-        time.sleep(0.5)
         self.send_log("debug", "System stats: heap=200KB, SPIFFS=900KB free")
-        time.sleep(0.5)
         self.send_log("warning", "Temperature sensor not responding")
-        time.sleep(0.5)
         self.send_log("error", "Failed to read sensor (retry 1/3)")
-        time.sleep(0.5)
 
         # Send heartbeats
         print("\n=== Phase 4: Heartbeats (idle periods) ===", file=sys.stderr)
@@ -205,9 +577,12 @@ class MockDevice:
         # More logs
         print("\n=== Phase 5: More logs ===", file=sys.stderr)
         self.send_log("info", "Sensor recovered, reading: 23.5°C")
-        time.sleep(0.5)
         self.send_log("info", "All systems nominal")
 
+        # Logs are pipelined, so wait for the tail of the window to drain
+        if not self.wait_for_acks():
+            print("[DEVICE] Some entries were never acknowledged", file=sys.stderr)
+
         print("\n[DEVICE] Test sequence complete!", file=sys.stderr)
         self.disconnect()
 
@@ -36,28 +36,26 @@ try:
     ser = serial.Serial(PORT, BAUD, timeout=TIMEOUT)
     time.sleep(0.5)  # Let port stabilize
 
-    # Clear any existing output file
-    with open(output_file, 'w') as f:
-        f.write("")
-
-    # Monitor serial output
+    # Monitor serial output (truncates any existing output file; the file
+    # stays open for the whole capture and receives the raw bytes)
     start_time = time.time()
     bytes_received = 0
 
-    while time.time() - start_time < duration:
-        if ser.in_waiting > 0:
-            data = ser.read(ser.in_waiting)
+    with open(output_file, 'wb') as f:
+        while time.time() - start_time < duration:
+            # Blocks until at least one byte arrives or TIMEOUT expires,
+            # then takes everything already buffered
+            data = ser.read(ser.in_waiting or 1)
+            if not data:
+                continue
             bytes_received += len(data)
 
-            # Decode and display
-            text = data.decode('utf-8', errors='replace')
-            print(text, end='', flush=True)
+            # Display raw bytes
+            sys.stdout.buffer.write(data)
+            sys.stdout.flush()
 
             # Append to file
-            with open(output_file, 'a') as f:
-                f.write(text)
-
-        time.sleep(0.05)  # Small delay to prevent CPU spinning
+            f.write(data)
 
     ser.close()
 
@@ -68,7 +66,7 @@ try:
     # Show file contents if small
     if os.path.getsize(output_file) < 5000:
         print(f"[SERIAL] File contents:", file=sys.stderr)
-        with open(output_file, 'r') as f:
+        with open(output_file, 'r', errors='replace') as f:
             print(f.read(), file=sys.stderr)
 
     sys.exit(0)